@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for the memory daemon.
+
+Usage: python3 -m gunicorn -c daemon/gunicorn_conf.py
+
+A single worker keeps one copy of the embedding matrix and ANN index in
+memory; threads let requests overlap while they wait on Ollama.
+"""
+
+import json
+from pathlib import Path
+
+DAEMON_DIR = Path(__file__).parent
+
+with open(DAEMON_DIR / "config.json") as f:
+    CONFIG = json.load(f)
+
+chdir = str(DAEMON_DIR)
+wsgi_app = "server:app"
+bind = f"0.0.0.0:{CONFIG['port']}"
+workers = 1
+worker_class = "gthread"
+threads = CONFIG.get("threads", 16)
+preload_app = True
+
+def on_starting(server):
+    """Load the schema, embedding matrix and ANN index once, before forking."""
+    import server as daemon
+    daemon.startup()
+    # SQLite connections must not be shared across fork()
+    daemon.close_db()
+
+def post_fork(server, worker):
+    """Catch a respawned worker's inherited caches up with rows stored since preload."""
+    import server as daemon
+    daemon.refresh_after_fork()
+    daemon.close_db()
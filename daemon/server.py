@@ -10,27 +10,148 @@ A Flask server that provides:
 Requires Ollama running with nomic-embed-text model.
 """
 
+import atexit
+import hashlib
 import json
+import os
+import queue
 import sqlite3
-import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional, get_args
 from flask import Flask, request, jsonify
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import simsimd
+except ImportError:  # optional SIMD kernels; fall back to NumPy
+    simsimd = None
+
+try:
+    from usearch.index import Index as ANNIndex
+except ImportError:  # optional HNSW index; fall back to brute-force scans
+    ANNIndex = None
+
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # optional fast JSON; fall back to Flask's stdlib provider
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:  # optional JIT int8 scan for when SimSIMD is missing
+    njit = None
+
+try:
+    import msgspec
+except ImportError:  # optional typed request decoding; fall back to request.json
+    msgspec = None
 
 app = Flask(__name__)
 
+if orjson is not None:
+    class ORJSONProvider(DefaultJSONProvider):
+        """Request/response JSON via orjson, which also serializes NumPy values."""
+
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
+
 # Load config
 CONFIG_PATH = Path(__file__).parent / "config.json"
 with open(CONFIG_PATH) as f:
     CONFIG = json.load(f)
 
 DB_PATH = Path(__file__).parent / "semantic-memory.db"
+INDEX_PATH = DB_PATH.with_suffix(".usearch")
+INDEX_META_PATH = DB_PATH.with_suffix(".usearch.json")  # version and fingerprint of INDEX_PATH
+
+# Snapshot of the float32 embedding matrix, memory-mapped on the next start.
+# The meta file records the (max(id), count) version it was written at and
+# the fingerprint of the database it came from.
+MATRIX_PATH = DB_PATH.with_suffix(".mat.npy")
+MATRIX_IDS_PATH = DB_PATH.with_suffix(".ids.npy")
+MATRIX_META_PATH = DB_PATH.with_suffix(".mat.json")
+MATRIX_SNAPSHOT_EVERY = 256  # new rows between snapshots while serving
 OLLAMA_URL = "http://localhost:11434/api/embeddings"
+OLLAMA_BATCH_URL = "http://localhost:11434/api/embed"  # Ollama 0.3+, takes a list
+
+# Embedding cache misses queued while every sender is busy with an Ollama
+# call are sent together as one /api/embed request of at most MAX_BATCH texts.
+EMBED_MAX_BATCH = 32
+EMBED_MAX_INFLIGHT = 4
+
+# Statements run on every request. sqlite3 keeps a per-connection cache of
+# compiled statements keyed by SQL text, so with the long-lived thread-local
+# connections these are parsed and planned once per thread.
+SQL_INSERT_LEARNING = """
+    INSERT INTO learnings (type, content, context, embedding, confidence, session_source, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_SELECT_EMBEDDING_BY_CONTENT = "SELECT embedding FROM learnings WHERE content_hash = ? AND content = ? LIMIT 1"
+SQL_SELECT_EMBEDDING_BY_ID = "SELECT embedding FROM learnings WHERE id = ?"
+SQL_LEARNINGS_VERSION = "SELECT MAX(id), COUNT(*) FROM learnings"
+SQL_COUNT_LEARNINGS = "SELECT COUNT(*) FROM learnings"
+SQL_COUNT_BY_TYPE = "SELECT type, COUNT(*) FROM learnings GROUP BY type"
+
+# Pooled keep-alive connections to Ollama, shared by every request thread
+_OLLAMA = requests.Session()
+_OLLAMA.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# In-memory embedding matrices, keyed by ("learnings", builder name).
+# Each entry is (ids, matrix, version, generation): matrix holds the decoded
+# rows aligned with ids (None for an empty table), version is the
+# (max(id), count) pair it was built from, and generation is the value of
+# _DB_GENERATION read before that build started.
+_EMB_CACHE = {}
+
+# Bumped after every write made through this daemon. A cache entry built at
+# the current generation is reused without querying SQLite at all; the
+# daemon is the only writer, so other changes show up after its next write.
+_DB_GENERATION = 0
+
+# Backing arrays for the cached matrices, with spare rows at the end so an
+# appended learning is copied in place instead of reallocating the matrix.
+_EMB_BUFFERS = {}
+_EMB_BUFFER_LOCK = threading.Lock()
+
+# HNSW index over learnings embeddings keyed by row id; None until the
+# first embedding is indexed or when usearch is not installed.
+_ANN_INDEX = None
+_ANN_DIRTY = False  # added to since the last save
+_ANN_LOCK = threading.Lock()
+
+# One long-lived SQLite connection per thread
+_CONN_LOCAL = threading.local()
+_WRITE_LOCK = threading.Lock()
+
+def db() -> sqlite3.Connection:
+    """Return this thread's database connection, opening it on first use."""
+    conn = getattr(_CONN_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            PRAGMA temp_store=MEMORY;
+        """)
+        _CONN_LOCAL.conn = conn
+    return conn
 
 def init_db():
     """Initialize the database schema."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db()
     cursor = conn.cursor()
     
     # Learnings table - curated, distilled knowledge
@@ -40,21 +161,124 @@ def init_db():
             type TEXT NOT NULL,
             content TEXT NOT NULL,
             context TEXT,
-            embedding BLOB NOT NULL,
+            embedding BLOB NOT NULL,  -- unit-norm vector, raw little-endian float32
             confidence REAL DEFAULT 0.9,
             session_source TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            content_hash BLOB  -- blake2b of content, indexed for embedding reuse
         )
     """)
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_learnings_type ON learnings(type)")
-    
     conn.commit()
-    conn.close()
+    
+    migrate_db()
+
+def migrate_db():
+    """Bring databases written by older daemon versions up to the current schema."""
+    conn = db()
+    cursor = conn.cursor()
+    
+    # One transaction, so an interrupted migration leaves the database untouched
+    with conn:
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # Embeddings used to be stored as JSON text; rewrite them as float32 blobs
+        cursor.execute("SELECT id, embedding FROM learnings WHERE substr(embedding, 1, 1) = '['")
+        legacy = cursor.fetchall()
+        if legacy:
+            cursor.executemany(
+                "UPDATE learnings SET embedding = ? WHERE id = ?",
+                [(encode_embedding(json.loads(emb)), row_id) for row_id, emb in legacy]
+            )
+            print(f"Migrated {len(legacy)} JSON embeddings to float32 blobs")
+        
+        # Schema version 1: stored embeddings are unit-norm
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] < 1:
+            cursor.execute("SELECT id, embedding FROM learnings")
+            cursor.executemany(
+                "UPDATE learnings SET embedding = ? WHERE id = ?",
+                [(encode_embedding(normalize(decode_embedding(blob))), row_id) for row_id, blob in cursor.fetchall()]
+            )
+            cursor.execute("PRAGMA user_version = 1")
+        
+        # Indexed content hashes, so reusing a stored embedding is not a table scan
+        cursor.execute("PRAGMA table_info(learnings)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "content_hash" not in columns:
+            cursor.execute("ALTER TABLE learnings ADD COLUMN content_hash BLOB")
+        cursor.execute("SELECT id, content FROM learnings WHERE content_hash IS NULL")
+        unhashed = cursor.fetchall()
+        if unhashed:
+            cursor.executemany(
+                "UPDATE learnings SET content_hash = ? WHERE id = ?",
+                [(content_hash(content), row_id) for row_id, content in unhashed]
+            )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_learnings_content_hash ON learnings(content_hash)")
+
+def encode_embedding(vec) -> bytes:
+    """Serialize an embedding as raw little-endian float32 bytes.
+
+    Callers store L2-normalized vectors, so readers can score them with a
+    plain dot product.
+    """
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Deserialize an embedding blob written by encode_embedding()."""
+    return np.frombuffer(blob, dtype="<f4")
 
-def embed(text: str) -> list[float]:
-    """Generate embedding using Ollama."""
+def content_hash(text: str) -> bytes:
+    """Digest of a learning's content, the indexed key for finding it by text."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+def embed(text: str) -> np.ndarray:
+    """Generate embedding, reusing the vector for text seen before."""
+    return _embed_cached(text)
+
+@lru_cache(maxsize=4096)
+def _embed_cached(text: str) -> np.ndarray:
+    # Stored learnings already carry the embedding of their content
+    cursor = db().cursor()
+    cursor.execute(SQL_SELECT_EMBEDDING_BY_CONTENT, (content_hash(text), text))
+    row = cursor.fetchone()
+    
+    vec = decode_embedding(row[0]) if row else np.asarray(_ollama_embed(text), dtype=np.float32)
+    vec.flags.writeable = False  # shared by every caller hitting the cache
+    return vec
+
+def query_embedding(text: str) -> np.ndarray:
+    """Unit-norm embedding of a /recall query, cached apart from stored content."""
+    return _query_cached(text)
+
+@lru_cache(maxsize=1024)
+def _query_cached(text: str) -> np.ndarray:
+    # Hooks re-ask the same prompt often; bulk /store traffic must not evict it.
+    # Sent straight to Ollama: a miss must not queue behind /store batches.
+    vec = normalize(_ollama_embed_single(text))
+    vec.flags.writeable = False
+    return vec
+
+def _ollama_embed(text: str) -> list[float]:
+    """Generate embedding using Ollama, sharing one request with concurrent callers."""
+    global _OLLAMA_WORKER
+    if not _OLLAMA_BATCHING:
+        return _ollama_embed_one(text)
+    future = Future()
+    _OLLAMA_QUEUE.put((text, future))
+    with _OLLAMA_WORKER_LOCK:
+        if _OLLAMA_WORKER is None:
+            _OLLAMA_WORKER = threading.Thread(target=_ollama_batches, name="ollama-batch", daemon=True)
+            _OLLAMA_WORKER.start()
+    # Worst case: a slot frees up after one call, then this batch's own call
+    try:
+        return future.result(timeout=2 * CONFIG["timeoutMs"] / 1000)
+    except FutureTimeout:
+        raise RuntimeError("Embedding failed: timed out waiting for Ollama")
+
+def _ollama_embed_one(text: str) -> list[float]:
     try:
-        resp = requests.post(
+        resp = _OLLAMA.post(
             OLLAMA_URL,
             json={"model": CONFIG["embeddingModel"], "prompt": text},
             timeout=CONFIG["timeoutMs"] / 1000
@@ -64,18 +288,512 @@ def embed(text: str) -> list[float]:
     except Exception as e:
         raise RuntimeError(f"Embedding failed: {e}")
 
-def cosine_similarity(a: list[float], b: list[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    a_np = np.array(a)
-    b_np = np.array(b)
-    return float(np.dot(a_np, b_np) / (np.linalg.norm(a_np) * np.linalg.norm(b_np)))
+def _ollama_embed_many(texts: list[str]) -> Optional[list[list[float]]]:
+    """Embed texts in one call; None if this Ollama has no batch endpoint."""
+    global _OLLAMA_BATCHING
+    try:
+        resp = _OLLAMA.post(
+            OLLAMA_BATCH_URL,
+            json={"model": CONFIG["embeddingModel"], "input": texts},
+            timeout=CONFIG["timeoutMs"] / 1000
+        )
+        # A missing route is a plain-text 404; a missing model is a JSON error
+        if resp.status_code == 404 and "json" not in resp.headers.get("Content-Type", ""):
+            _OLLAMA_BATCHING = False
+            return None
+        resp.raise_for_status()
+        vectors = resp.json()["embeddings"]
+        if len(vectors) != len(texts):
+            raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        return vectors
+    except Exception as e:
+        raise RuntimeError(f"Embedding failed: {e}")
+
+_OLLAMA_QUEUE = queue.Queue()
+_OLLAMA_BATCHING = True
+_OLLAMA_WORKER = None
+_OLLAMA_WORKER_LOCK = threading.Lock()
+_OLLAMA_SENDERS = ThreadPoolExecutor(max_workers=EMBED_MAX_INFLIGHT, thread_name_prefix="ollama-send")
+_OLLAMA_SLOTS = threading.Semaphore(EMBED_MAX_INFLIGHT)
+
+def _ollama_batches():
+    while True:
+        first = _OLLAMA_QUEUE.get()
+        # No extra wait: take whatever queued up while every sender was busy
+        _OLLAMA_SLOTS.acquire()
+        batch = [first]
+        while len(batch) < EMBED_MAX_BATCH:
+            try:
+                batch.append(_OLLAMA_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        _OLLAMA_SENDERS.submit(_ollama_send_batch, batch)
+
+def _ollama_send_batch(batch):
+    try:
+        try:
+            vectors = _ollama_embed_many([text for text, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            vectors = None  # retry one by one so a bad input fails only its own caller
+        
+        if vectors is not None:
+            for (_, future), vec in zip(batch, vectors):
+                future.set_result(vec)
+            return
+        for text, future in batch:
+            try:
+                future.set_result(_ollama_embed_single(text))
+            except Exception as e:
+                future.set_exception(e)
+    finally:
+        _OLLAMA_SLOTS.release()
+
+def _ollama_embed_single(text: str) -> list[float]:
+    if _OLLAMA_BATCHING:
+        vectors = _ollama_embed_many([text])
+        if vectors is not None:
+            return vectors[0]
+    return _ollama_embed_one(text)
+
+def batch_cosine(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity of one query against every row of a matrix (SimSIMD when available)."""
+    dists = simsimd.cdist(query[None, :], matrix, metric="cosine")
+    return 1.0 - np.asarray(dists, dtype=np.float32)[0]
+
+if njit is not None:
+    # Serial and nogil: concurrent request threads provide the parallelism,
+    # and numba's default threading layer aborts on concurrent prange launches
+    @njit(cache=True, nogil=True)
+    def _i8_dot_scan(matrix, q):
+        out = np.empty(matrix.shape[0], dtype=np.int32)
+        for i in range(matrix.shape[0]):
+            acc = np.int32(0)
+            for j in range(matrix.shape[1]):
+                acc += np.int32(matrix[i, j]) * np.int32(q[j])
+            out[i] = acc
+        return out
+
+def normalize(vec) -> np.ndarray:
+    """Return vec as a unit-length float32 array."""
+    v = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+def quantize_embedding(vec) -> tuple[np.ndarray, float]:
+    """Symmetric int8 quantization of a unit vector with a single per-vector scale."""
+    v = normalize(vec)
+    max_abs = float(np.abs(v).max()) if v.size else 0.0
+    if max_abs == 0:
+        return np.zeros(v.shape, dtype=np.int8), 1.0
+    scale = max_abs / 127
+    return np.round(v / scale).astype(np.int8), scale
+
+# Set-bit count of every byte value, for Hamming distance without SimSIMD
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def embedding_signature(vec) -> np.ndarray:
+    """Pack the sign bits of an embedding (1 bit per dimension)."""
+    return np.packbits(np.asarray(vec) > 0)
+
+def _build_f32_matrix(rows) -> np.ndarray:
+    # Stored embeddings are already unit-norm
+    return np.vstack([decode_embedding(row[1]) for row in rows]).astype(np.float32, copy=False)
+
+def _build_f16_matrix(rows) -> np.ndarray:
+    return np.vstack([decode_embedding(row[1]) for row in rows]).astype(np.float16)
+
+def _build_sig_matrix(rows) -> np.ndarray:
+    # Derived at load time, like the f16 matrix, rather than stored per row
+    return np.packbits(_build_f32_matrix(rows) > 0, axis=1)
+
+def _build_i8_matrix(rows) -> tuple[np.ndarray, np.ndarray]:
+    # Same per-row scheme as quantize_embedding(), vectorized over the table
+    matrix = _build_f32_matrix(rows)
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+def _grow_into(buffer, current: np.ndarray, extra: np.ndarray) -> np.ndarray:
+    """Write extra after current in buffer, doubling its capacity when full."""
+    used = len(current)
+    needed = used + len(extra)
+    if buffer is None or needed > len(buffer) or not np.may_share_memory(buffer, current):
+        buffer = np.empty((max(needed, 2 * used),) + extra.shape[1:], dtype=extra.dtype)
+        buffer[:used] = current
+    buffer[used:needed] = extra
+    return buffer
+
+def _append_rows(key, ids, matrix, new_ids, new):
+    """Append rows to a cached (ids, matrix) pair without copying existing rows."""
+    parts = (ids,) + (matrix if isinstance(matrix, tuple) else (matrix,))
+    extras = (new_ids,) + (new if isinstance(new, tuple) else (new,))
+    needed = len(ids) + len(new_ids)
+    with _EMB_BUFFER_LOCK:
+        buffers = _EMB_BUFFERS.get(key) or (None,) * len(parts)
+        buffers = tuple(_grow_into(b, cur, extra) for b, cur, extra in zip(buffers, parts, extras))
+        _EMB_BUFFERS[key] = buffers
+    views = tuple(b[:needed] for b in buffers)
+    return views[0], (views[1:] if isinstance(matrix, tuple) else views[1])
+
+def _load_matrix(cursor, columns: str, build):
+    """Return (ids, matrix) for learnings, rebuilding the cache only when rows changed."""
+    key = ("learnings", build.__name__)
+    generation = _DB_GENERATION  # read before querying so a concurrent write is not missed
+    cached = _EMB_CACHE.get(key)
+    if cached is not None and cached[3] == generation:
+        return cached[0], cached[1]
+    
+    cursor.execute(SQL_LEARNINGS_VERSION)
+    version = tuple(cursor.fetchone())
+    if cached is not None and cached[2] == version:
+        # Stamped only now, once the entry is known to match the table
+        _EMB_CACHE[key] = cached[:3] + (generation,)
+        return cached[0], cached[1]
+
+    # Rows are only ever appended, so fetch just the new ones when possible
+    if cached is not None and cached[1] is not None and version[0] is not None:
+        cached_ids, cached_matrix, (cached_max, cached_count), _ = cached
+        cursor.execute(f"SELECT id, {columns} FROM learnings WHERE id > ? ORDER BY id", (cached_max,))
+        rows = cursor.fetchall()
+        if rows and cached_count + len(rows) == version[1]:
+            new_ids = np.array([row[0] for row in rows], dtype=np.int64)
+            ids, matrix = _append_rows(key, cached_ids, cached_matrix, new_ids, build(rows))
+            _EMB_CACHE[key] = (ids, matrix, (int(ids[-1]), len(ids)), generation)
+            return ids, matrix
+
+    cursor.execute(f"SELECT id, {columns} FROM learnings ORDER BY id")
+    rows = cursor.fetchall()
+    with _EMB_BUFFER_LOCK:
+        _EMB_BUFFERS.pop(key, None)
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    if rows:
+        matrix = build(rows)
+        version = (int(ids.max()), len(ids))
+    else:
+        matrix = None
+        version = (None, 0)
+
+    _EMB_CACHE[key] = (ids, matrix, version, generation)
+    return ids, matrix
+
+def mark_learnings_changed():
+    """Invalidate cached matrices after writing to the learnings table."""
+    global _DB_GENERATION
+    _DB_GENERATION += 1
+
+def load_embedding_matrix(cursor) -> tuple[np.ndarray, np.ndarray]:
+    """Return (ids, matrix) of L2-normalized float32 embeddings."""
+    return _load_matrix(cursor, "embedding", _build_f32_matrix)
+
+def load_half_matrix(cursor) -> tuple[np.ndarray, np.ndarray]:
+    """Return (ids, matrix) of L2-normalized float16 embeddings."""
+    return _load_matrix(cursor, "embedding", _build_f16_matrix)
+
+def load_quantized_matrix(cursor) -> tuple[np.ndarray, tuple]:
+    """Return (ids, (int8 matrix, per-row scales)) of quantized embeddings."""
+    return _load_matrix(cursor, "embedding", _build_i8_matrix)
+
+def load_signature_matrix(cursor) -> tuple[np.ndarray, np.ndarray]:
+    """Return (ids, matrix) of packed sign-bit signatures."""
+    return _load_matrix(cursor, "embedding", _build_sig_matrix)
+
+def prefilter_learnings(cursor, query_embedding, shortlist: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rank by Hamming distance of sign bits, then score only the shortlist exactly."""
+    if shortlist <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    q = normalize(query_embedding)
+    sig_ids, sigs = load_signature_matrix(cursor)
+    ids, matrix = load_embedding_matrix(cursor)
+    if sigs is None or matrix is None or len(sig_ids) != len(ids):
+        return score_learnings(cursor, query_embedding)
+    
+    q_sig = embedding_signature(q)
+    if simsimd is not None:
+        dists = np.asarray(simsimd.cdist(q_sig[None, :], sigs, metric="hamming", dtype="bin8"))[0]
+    else:
+        dists = _POPCOUNT[np.bitwise_xor(sigs, q_sig)].sum(axis=1, dtype=np.int32)
+    if shortlist < len(ids):
+        candidates = np.argpartition(dists, shortlist - 1)[:shortlist]
+    else:
+        candidates = np.arange(len(ids))
+    return ids[candidates], matrix[candidates] @ q
+
+def scoring_precision() -> str:
+    """The configured quantization, with f16 demoted to f32 when SimSIMD is missing."""
+    precision = CONFIG.get("quantization", "f32")
+    if precision == "f16" and simsimd is None:
+        return "f32"  # NumPy's float16 matmul has no BLAS and is ~18x slower than f32
+    return precision
+
+def score_learnings(cursor, query_embedding) -> tuple[np.ndarray, np.ndarray]:
+    """Return (ids, cosine similarities) of every stored learning against a query."""
+    q = normalize(query_embedding)
+    precision = scoring_precision()
+    if precision == "i8":
+        ids, quantized = load_quantized_matrix(cursor)
+        if quantized is None:
+            return ids, np.empty(0, dtype=np.float32)
+        matrix, scales = quantized
+        q_i8, q_scale = quantize_embedding(q)
+        if simsimd is not None:
+            # Cosine is scale-invariant, so the int8 rows can be compared directly
+            return ids, batch_cosine(q_i8, matrix)
+        # int32 accumulator, then undo both quantization scales
+        if njit is not None:
+            dots = _i8_dot_scan(matrix, q_i8)
+        else:
+            dots = matrix @ q_i8.astype(np.int32)
+        sims = dots * (scales * np.float32(q_scale))
+        return ids, sims.astype(np.float32, copy=False)
+
+    if precision == "f16":
+        ids, matrix = load_half_matrix(cursor)
+        q = q.astype(np.float16)
+    else:
+        ids, matrix = load_embedding_matrix(cursor)
+    if matrix is None:
+        return ids, np.empty(0, dtype=np.float32)
+    # Rows and query are unit-norm, so the dot product is the cosine.
+    # f32 is a BLAS sgemv; NumPy has no half-precision BLAS, SimSIMD does.
+    if precision == "f16":
+        return ids, np.asarray(simsimd.cdist(q[None, :], matrix, metric="dot"), dtype=np.float32)[0]
+    return ids, (matrix @ q).astype(np.float32, copy=False)
+
+_SNAPSHOT_VERSION = None
+_SNAPSHOT_LOCK = threading.Lock()
+
+def learnings_fingerprint(cursor, max_id) -> Optional[str]:
+    """Hash of the embedding stored at max_id, tying sidecar files to this database."""
+    if max_id is None:
+        return None
+    cursor.execute(SQL_SELECT_EMBEDDING_BY_ID, (max_id,))
+    row = cursor.fetchone()
+    return hashlib.blake2b(row[0], digest_size=16).hexdigest() if row else None
+
+def _read_matrix_snapshot(cursor):
+    try:
+        with open(MATRIX_META_PATH) as f:
+            meta = json.load(f)
+        matrix = np.load(MATRIX_PATH, mmap_mode="r")
+        ids = np.load(MATRIX_IDS_PATH)
+        version = (meta["max_id"], meta["count"])
+        fingerprint = meta["fingerprint"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    
+    if len(ids) != version[1] or matrix.shape[0] != version[1]:
+        return None
+    cursor.execute("SELECT COUNT(*) FROM learnings WHERE id <= ?", (version[0],))
+    if cursor.fetchone()[0] != version[1]:
+        return None
+    # Same row count up to max_id is not enough: the database may have been replaced
+    if fingerprint != learnings_fingerprint(cursor, version[0]):
+        return None
+    return ids, matrix, version
+
+def load_matrix_snapshot():
+    """Seed the float32 matrix cache from the on-disk snapshot if it is still a prefix of the table."""
+    global _SNAPSHOT_VERSION
+    snapshot = _read_matrix_snapshot(db().cursor())
+    if snapshot is None:
+        # Missing, torn or from another database; a fresh one is written after the rebuild
+        for path in (MATRIX_META_PATH, MATRIX_PATH, MATRIX_IDS_PATH):
+            path.unlink(missing_ok=True)
+        return
+    
+    # Rows added since the snapshot are appended by the next cache refresh
+    ids, matrix, version = snapshot
+    _EMB_CACHE[("learnings", _build_f32_matrix.__name__)] = (ids, matrix, version, None)
+    _SNAPSHOT_VERSION = version
+
+@atexit.register
+def save_matrix_snapshot():
+    """Write the cached float32 matrix next to the database, atomically."""
+    global _SNAPSHOT_VERSION
+    key = ("learnings", _build_f32_matrix.__name__)
+    with _SNAPSHOT_LOCK:
+        if key not in _EMB_CACHE:
+            return  # never loaded in this process
+        cursor = db().cursor()
+        ids, matrix = load_embedding_matrix(cursor)
+        version = _EMB_CACHE[key][2]
+        if matrix is None or version == _SNAPSHOT_VERSION:
+            return
+        fingerprint = learnings_fingerprint(cursor, version[0])
+        for path, array in ((MATRIX_PATH, matrix), (MATRIX_IDS_PATH, ids)):
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+        # Meta goes last so a torn write never validates
+        tmp = MATRIX_META_PATH.with_name(MATRIX_META_PATH.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"max_id": version[0], "count": version[1], "fingerprint": fingerprint}, f)
+        os.replace(tmp, MATRIX_META_PATH)
+        _SNAPSHOT_VERSION = version
+
+def load_ann_index():
+    """Load the persisted HNSW index, rebuilding it from the database if stale."""
+    global _ANN_INDEX
+    if ANNIndex is None:
+        return
+    
+    cursor = db().cursor()
+    cursor.execute(SQL_LEARNINGS_VERSION)
+    max_id, count = cursor.fetchone()
+    
+    try:
+        with open(INDEX_META_PATH) as f:
+            meta = json.load(f)
+        valid = (meta["max_id"], meta["count"]) == (max_id, count) \
+            and meta["fingerprint"] == learnings_fingerprint(cursor, max_id)
+    except (OSError, ValueError, KeyError, TypeError):
+        valid = False
+    index = ANNIndex.restore(str(INDEX_PATH)) if valid and INDEX_PATH.exists() else None
+    if index is not None and len(index) == count:
+        _ANN_INDEX = index
+        return
+    # Missing, stale or from another database
+    for path in (INDEX_META_PATH, INDEX_PATH):
+        path.unlink(missing_ok=True)
+    
+    ids, matrix = load_embedding_matrix(cursor)
+    if matrix is None:
+        _ANN_INDEX = None
+        return
+    index = ANNIndex(ndim=matrix.shape[1], metric="cos", dtype="f32")
+    index.add(ids, matrix)
+    _write_ann_index(index, cursor)
+    _ANN_INDEX = index
+    print(f"Built ANN index over {len(ids)} learnings")
+
+def ann_add(learning_id: int, embedding):
+    """Add a stored learning to the HNSW index."""
+    global _ANN_INDEX, _ANN_DIRTY
+    if ANNIndex is None:
+        return
+    vec = normalize(embedding)
+    with _ANN_LOCK:
+        if _ANN_INDEX is None:
+            _ANN_INDEX = ANNIndex(ndim=vec.size, metric="cos", dtype="f32")
+        _ANN_INDEX.add(learning_id, vec)
+        _ANN_DIRTY = True
+
+def _write_ann_index(index, cursor):
+    # Meta is removed first and written last, so a torn save never validates
+    INDEX_META_PATH.unlink(missing_ok=True)
+    index.save(str(INDEX_PATH))
+    max_id = int(np.asarray(index.keys).max()) if len(index) else None
+    tmp = INDEX_META_PATH.with_name(INDEX_META_PATH.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({
+            "max_id": max_id,
+            "count": len(index),
+            "fingerprint": learnings_fingerprint(cursor, max_id)
+        }, f)
+    os.replace(tmp, INDEX_META_PATH)
+
+@atexit.register
+def save_ann_index():
+    """Persist the HNSW index so the next start can skip rebuilding it."""
+    global _ANN_DIRTY
+    with _ANN_LOCK:
+        if _ANN_INDEX is not None and _ANN_DIRTY:
+            _write_ann_index(_ANN_INDEX, db().cursor())
+            _ANN_DIRTY = False
+
+def nearest_learning(cursor, embedding) -> tuple[Optional[int], float]:
+    """Return (id, similarity) of the stored learning closest to an embedding."""
+    if _ANN_INDEX is not None and len(_ANN_INDEX):
+        matches = _ANN_INDEX.search(normalize(embedding), 1)
+        return int(matches.keys[0]), 1.0 - float(matches.distances[0])
+    
+    ids, sims = score_learnings(cursor, embedding)
+    if not len(ids):
+        return None, 0.0
+    best = int(np.argmax(sims))
+    return int(ids[best]), float(sims[best])
+
+def fetch_learnings(cursor, ids) -> dict:
+    """Fetch display fields for the given learning ids, keyed by id."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    cursor.execute(
+        f"SELECT id, type, content, context, confidence FROM learnings WHERE id IN ({placeholders})",
+        ids
+    )
+    return {row[0]: row for row in cursor.fetchall()}
+
+def top_k(sims: np.ndarray, min_similarity: float, k: int) -> np.ndarray:
+    """Indices of the k highest similarities >= min_similarity, best first."""
+    candidates = np.flatnonzero(sims >= min_similarity)
+    k = min(int(k), candidates.size)
+    if k <= 0:
+        return candidates[:0]
+    if k < candidates.size:
+        candidates = candidates[np.argpartition(-sims[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-sims[candidates], kind="stable")]
+
+_Struct = msgspec.Struct if msgspec is not None else object
+
+class StoreRequest(_Struct):
+    """Body of POST /store."""
+    type: str
+    content: str
+    context: Optional[str] = None
+    confidence: Optional[float] = None  # extraction agents sometimes send null
+    session_source: Optional[str] = None
+
+class RecallRequest(_Struct):
+    """Body of POST /recall."""
+    query: str
+    minSimilarity: float = CONFIG["minSimilarity"]
+    maxResults: int = CONFIG["maxResults"]
+
+def parse_body(schema):
+    """Decode the JSON body into schema; ValueError carries the reason it was rejected."""
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(request.get_data(), type=schema)
+        except msgspec.MsgspecError as e:
+            raise ValueError(str(e))
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    body = schema()
+    for field, annotation in schema.__annotations__.items():
+        if field in data:
+            setattr(body, field, _check_field(field, annotation, data[field]))
+        elif not hasattr(schema, field):
+            raise ValueError(f"Object missing required field `{field}`")
+    return body
+
+# JSON types accepted for each annotation, matching msgspec's decoding rules
+_JSON_TYPES = {str: (str,), int: (int,), float: (int, float)}
+
+def _check_field(field: str, annotation, value):
+    allowed = get_args(annotation) or (annotation,)  # Optional[X] is Union[X, None]
+    if value is None and type(None) in allowed:
+        return value
+    for expected in allowed:
+        if isinstance(value, _JSON_TYPES.get(expected, ())) and not isinstance(value, bool):
+            return value
+    expected = " | ".join("null" if t is type(None) else t.__name__ for t in allowed)
+    got = "null" if value is None else type(value).__name__
+    raise ValueError(f"Expected `{expected}`, got `{got}` - at `$.{field}`")
 
 @app.route("/health", methods=["GET"])
 def health():
     """Health check endpoint."""
     try:
         # Check Ollama is running
-        resp = requests.get("http://localhost:11434/api/tags", timeout=2)
+        resp = _OLLAMA.get("http://localhost:11434/api/tags", timeout=2)
         ollama_ok = resp.status_code == 200
     except:
         ollama_ok = False
@@ -90,116 +808,194 @@ def health():
 @app.route("/store", methods=["POST"])
 def store():
     """Store a new learning with its embedding."""
-    data = request.json
-    
-    required = ["type", "content"]
-    if not all(k in data for k in required):
-        return jsonify({"error": f"Missing required fields: {required}"}), 400
+    try:
+        body = parse_body(StoreRequest)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
-        embedding = embed(data["content"])
+        embedding = normalize(embed(body.content))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = db()
     cursor = conn.cursor()
     
-    # Check for duplicates
-    cursor.execute("SELECT id, embedding FROM learnings")
-    for row in cursor.fetchall():
-        existing_embedding = json.loads(row[1])
-        sim = cosine_similarity(embedding, existing_embedding)
-        if sim >= CONFIG["duplicateThreshold"]:
-            conn.close()
+    # Serialize writers so two identical stores cannot both pass the duplicate check
+    with _WRITE_LOCK:
+        # Check for duplicates
+        existing_id, sim = nearest_learning(cursor, embedding)
+        if existing_id is not None and sim >= CONFIG["duplicateThreshold"]:
             return jsonify({
                 "status": "duplicate",
-                "existing_id": row[0],
+                "existing_id": existing_id,
                 "similarity": sim
             })
+        
+        with conn:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(SQL_INSERT_LEARNING, (
+                body.type,
+                body.content,
+                body.context,
+                encode_embedding(embedding),
+                0.9 if body.confidence is None else body.confidence,
+                body.session_source,
+                content_hash(body.content)
+            ))
+        learning_id = cursor.lastrowid
+        mark_learnings_changed()
+        
+        ann_add(learning_id, embedding)
     
-    cursor.execute("""
-        INSERT INTO learnings (type, content, context, embedding, confidence, session_source)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        data["type"],
-        data["content"],
-        data.get("context"),
-        json.dumps(embedding),
-        data.get("confidence", 0.9),
-        data.get("session_source")
-    ))
-    
-    learning_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    snapshot_max_id = (_SNAPSHOT_VERSION or (None, 0))[0] or 0
+    if learning_id - snapshot_max_id >= MATRIX_SNAPSHOT_EVERY:
+        save_matrix_snapshot()
     
     return jsonify({"status": "stored", "id": learning_id})
 
 @app.route("/recall", methods=["POST"])
 def recall():
     """Query for relevant memories."""
-    data = request.json
+    try:
+        body = parse_body(RecallRequest)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    if "query" not in data:
-        return jsonify({"error": "Missing 'query' field"}), 400
+    min_similarity = body.minSimilarity
+    max_results = body.maxResults
+    if max_results <= 0:
+        # usearch crashes the process on count=0 and rejects negative counts
+        return jsonify({"memories": [], "count": 0})
     
     try:
-        query_embedding = embed(data["query"])
+        query_vec = query_embedding(body.query)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
-    min_similarity = data.get("minSimilarity", CONFIG["minSimilarity"])
-    max_results = data.get("maxResults", CONFIG["maxResults"])
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, type, content, context, embedding, confidence FROM learnings")
+    cursor = db().cursor()
     
-    results = []
-    for row in cursor.fetchall():
-        stored_embedding = json.loads(row[4])
-        sim = cosine_similarity(query_embedding, stored_embedding)
-        
-        if sim >= min_similarity:
-            results.append({
-                "id": row[0],
-                "type": row[1],
-                "content": row[2],
-                "context": row[3],
-                "confidence": row[5],
-                "similarity": round(sim, 4)
-            })
+    if _ANN_INDEX is not None and len(_ANN_INDEX):
+        # Graph search over the HNSW index, over-fetching to survive the threshold
+        matches = _ANN_INDEX.search(query_vec, max_results * 3)
+        ids = matches.keys
+        sims = 1.0 - matches.distances
+    elif CONFIG.get("binaryPrefilter", False):
+        # Cheap sign-bit Hamming pass picks candidates for exact cosine
+        ids, sims = prefilter_learnings(cursor, query_vec, max_results * 10)
+    else:
+        # Score every stored learning in one matrix-vector product
+        ids, sims = score_learnings(cursor, query_vec)
     
-    conn.close()
+    top = top_k(sims, min_similarity, max_results)
+    rows = fetch_learnings(cursor, ids[top])
     
-    # Sort by similarity and limit
-    results.sort(key=lambda x: x["similarity"], reverse=True)
-    results = results[:max_results]
+    results = []
+    for i in top:
+        row = rows.get(int(ids[i]))
+        if row is None:
+            continue
+        results.append({
+            "id": row[0],
+            "type": row[1],
+            "content": row[2],
+            "context": row[3],
+            "confidence": row[4],
+            "similarity": round(float(sims[i]), 4)
+        })
     
     return jsonify({"memories": results, "count": len(results)})
 
 @app.route("/stats", methods=["GET"])
 def stats():
     """Get database statistics."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = db().cursor()
     
-    cursor.execute("SELECT COUNT(*) FROM learnings")
+    cursor.execute(SQL_COUNT_LEARNINGS)
     total = cursor.fetchone()[0]
     
-    cursor.execute("SELECT type, COUNT(*) FROM learnings GROUP BY type")
+    cursor.execute(SQL_COUNT_BY_TYPE)
     by_type = dict(cursor.fetchall())
     
-    conn.close()
+    cache = _embed_cached.cache_info()
+    query_cache = _query_cached.cache_info()
     
     return jsonify({
         "total_learnings": total,
-        "by_type": by_type
+        "by_type": by_type,
+        "embedding_cache": {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "size": cache.currsize,
+            "max_size": cache.maxsize
+        },
+        "query_cache": {
+            "hits": query_cache.hits,
+            "misses": query_cache.misses,
+            "size": query_cache.currsize,
+            "max_size": query_cache.maxsize
+        }
     })
 
-if __name__ == "__main__":
+def startup():
+    """Prepare the schema, embedding matrix and ANN index before serving."""
     init_db()
+    cursor = db().cursor()
+    load_ann_index()
+    if _ANN_INDEX is not None:
+        # HNSW serves /recall and duplicate checks; none of the matrices are scored
+        _EMB_CACHE.clear()
+        with _EMB_BUFFER_LOCK:
+            _EMB_BUFFERS.clear()
+        return
+    precision = scoring_precision()
+    # The f32 matrix is kept only when something scores against it
+    uses_f32 = precision == "f32" or CONFIG.get("binaryPrefilter", False)
+    if uses_f32:
+        load_matrix_snapshot()
+        load_embedding_matrix(cursor)
+        save_matrix_snapshot()
+    # Warm whichever matrices /recall scores against so no request pays for the load
+    if precision == "i8":
+        load_quantized_matrix(cursor)
+        if njit is not None and simsimd is None:
+            _i8_dot_scan(np.zeros((1, 1), dtype=np.int8), np.zeros(1, dtype=np.int8))  # compile now
+    elif precision == "f16":
+        load_half_matrix(cursor)
+    if CONFIG.get("binaryPrefilter", False):
+        load_signature_matrix(cursor)
+
+def refresh_after_fork():
+    """Catch state inherited from a pre-fork startup() up with rows written since."""
+    global _ANN_DIRTY
+    # Another worker may have written while this one was being respawned
+    for key, cached in list(_EMB_CACHE.items()):
+        _EMB_CACHE[key] = cached[:3] + (None,)
+    if _ANN_INDEX is None:
+        load_ann_index()
+        return
+    with _ANN_LOCK:
+        max_id = int(np.asarray(_ANN_INDEX.keys).max()) if len(_ANN_INDEX) else 0
+        cursor = db().cursor()
+        cursor.execute("SELECT id, embedding FROM learnings WHERE id > ? ORDER BY id", (max_id,))
+        rows = cursor.fetchall()
+        if rows:
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            _ANN_INDEX.add(ids, _build_f32_matrix(rows))
+            _ANN_DIRTY = True
+
+def close_db():
+    """Close this thread's database connection, if one is open."""
+    conn = getattr(_CONN_LOCAL, "conn", None)
+    if conn is not None:
+        conn.close()
+        _CONN_LOCAL.conn = None
+
+if __name__ == "__main__":
+    # waitress works on Windows too; gunicorn_conf.py is the Linux alternative
+    from waitress import serve
+    startup()
     print(f"Memory daemon starting on port {CONFIG['port']}")
     print(f"Database: {DB_PATH}")
     print(f"Model: {CONFIG['embeddingModel']}")
-    app.run(host="0.0.0.0", port=CONFIG["port"])
+    serve(app, host="0.0.0.0", port=CONFIG["port"], threads=CONFIG.get("threads", 16))
@@ -44,7 +44,13 @@ else
     if [ "$DAEMON_HOST" = "127.0.0.1" ] && [ -n "$DAEMON_DIR" ] && [ -f "${DAEMON_DIR}/server.py" ]; then
         echo "Starting memory daemon..." >&2
         cd "$DAEMON_DIR"
-        nohup python3 server.py > daemon.log 2>&1 &
+        # Same interpreter as the fallback, so flask and numpy are importable.
+        # gunicorn.util needs fcntl, so this also fails on Windows.
+        if python3 -c 'import gunicorn.util' > /dev/null 2>&1; then
+            nohup python3 -m gunicorn -c gunicorn_conf.py > daemon.log 2>&1 &
+        else
+            nohup python3 server.py > daemon.log 2>&1 &
+        fi
         
         # Wait for startup
         for i in {1..10}; do